@@ -0,0 +1,33 @@
+"""add trigram indexes for name/brand search
+
+Revision ID: e3a7f29c41d6
+Revises: b822ba0ea0e5
+Create Date: 2026-10-19 10:12:05.118234
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a7f29c41d6'
+down_revision: Union[str, Sequence[str], None] = 'b822ba0ea0e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pg_trgm GIN indexes back the word-similarity search in /api/search
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_gas_stations_name_trgm ON gas_stations USING gin (name gin_trgm_ops)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_gas_stations_brand_trgm ON gas_stations USING gin (brand gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Extension is left in place; other objects may depend on it
+    op.execute("DROP INDEX IF EXISTS ix_gas_stations_brand_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_gas_stations_name_trgm")
@@ -0,0 +1,68 @@
+"""add nearby cell candidates precomputation
+
+Revision ID: f5b1d8e2a937
+Revises: e3a7f29c41d6
+Create Date: 2026-10-19 15:40:52.604417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.nearby_cells import TRACK_CHANGES_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5b1d8e2a937'
+down_revision: Union[str, Sequence[str], None] = 'e3a7f29c41d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Areas worth precomputing (filled in by ops, e.g. metro bounding boxes)
+    op.execute("""
+        CREATE TABLE nearby_hot_areas (
+            name text PRIMARY KEY,
+            area geometry(Polygon, 4326) NOT NULL
+        )
+    """)
+    # Per geohash cell: nearest candidate station ids and the radius they are complete for.
+    # source_oid is the OID of the gas_stations table they were computed from, so readers
+    # can tell the lists are stale after a restore recreates the table.
+    op.execute("""
+        CREATE TABLE nearby_cell_candidates (
+            resolution smallint NOT NULL,
+            cell text NOT NULL,
+            bounds geometry(Polygon, 4326) NOT NULL,
+            station_ids bigint[],
+            covered_km double precision,
+            computed_at timestamptz,
+            source_oid oid,
+            PRIMARY KEY (resolution, cell)
+        )
+    """)
+    # Change log written by triggers so refreshes only touch cells near changed stations.
+    # A NULL geom means "everything changed" (TRUNCATE).
+    op.execute("""
+        CREATE TABLE gas_stations_changes (
+            id bigserial PRIMARY KEY,
+            geom geography
+        )
+    """)
+    op.execute("CREATE INDEX ix_nearby_cell_candidates_bounds ON nearby_cell_candidates USING gist ((bounds::geography))")
+    # Shared with app.precompute, which reinstalls them after pg_restore --clean
+    for sql in TRACK_CHANGES_DDL:
+        op.execute(sql)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS gas_stations_track_truncate ON gas_stations")
+    op.execute("DROP TRIGGER IF EXISTS gas_stations_track_changes ON gas_stations")
+    op.execute("DROP FUNCTION IF EXISTS gas_stations_track_changes()")
+    op.execute("DROP TABLE IF EXISTS gas_stations_changes")
+    op.execute("DROP TABLE IF EXISTS nearby_cell_candidates")
+    op.execute("DROP TABLE IF EXISTS nearby_hot_areas")
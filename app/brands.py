@@ -0,0 +1,84 @@
+# app/brands.py
+import asyncio
+import re
+import time
+from collections.abc import Iterable
+from .db import dataset_version, list_brands
+
+# How often (seconds) to re-check the dataset version before serving from the trie
+VERSION_CHECK_INTERVAL = 60
+
+def normalize_brand_name(brand: str | None) -> str | None:
+    # Same rules as normalizeBrandName in ui/js/app.js: "Circle K" -> "circle_k"
+    if not brand:
+        return None
+    return re.sub(r"\s+", "_", brand.lower().strip())
+
+class _Node:
+    __slots__ = ("children", "brand")
+
+    def __init__(self):
+        self.children: dict[str, "_Node"] = {}
+        self.brand: str | None = None  # display spelling if a normalized key ends here
+
+class BrandTrie:
+    """Prefix trie of normalized brand names -> one display spelling per name."""
+
+    def __init__(self, brands: Iterable[str] = ()):
+        self.root = _Node()
+        for brand in brands:
+            self.insert(brand)
+
+    def insert(self, brand: str):
+        # First spelling wins; list_brands() returns the most common one first
+        key = normalize_brand_name(brand)
+        if not key:
+            return
+        node = self.root
+        for ch in key:
+            node = node.children.setdefault(ch, _Node())
+        if node.brand is None:
+            node.brand = brand
+
+    def complete(self, prefix: str, limit: int = 10) -> list[str]:
+        node = self.root
+        for ch in normalize_brand_name(prefix) or "":
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        # Depth-first walk in key order so results come back alphabetically
+        results: list[str] = []
+        stack = [node]
+        while stack and len(results) < limit:
+            node = stack.pop()
+            if node.brand is not None:
+                results.append(node.brand)
+            stack.extend(node.children[ch] for ch in sorted(node.children, reverse=True))
+        return results
+
+_trie = BrandTrie()
+_version: str | None = None
+_checked_at = 0.0
+_lock = asyncio.Lock()
+
+def _is_fresh() -> bool:
+    # _version is None until the first build, whatever the monotonic clock reads
+    return _version is not None and time.monotonic() - _checked_at < VERSION_CHECK_INTERVAL
+
+async def refresh_brand_trie(force: bool = False):
+    """Rebuild the trie if the dataset version changed since the last build."""
+    global _trie, _version, _checked_at
+    if not force and _is_fresh():
+        return
+    async with _lock:
+        if not force and _is_fresh():
+            return  # another request refreshed while we waited
+        version = await dataset_version()
+        if force or version != _version:
+            _trie = BrandTrie(await list_brands())
+            _version = version
+        _checked_at = time.monotonic()
+
+async def suggest_brands(prefix: str, limit: int = 10) -> list[str]:
+    await refresh_brand_trie()
+    return _trie.complete(prefix, limit)
@@ -1,9 +1,11 @@
 # app/db.py
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy import text
+import asyncio
 import os
 from urllib.parse import quote_plus
 import dotenv
+from .nearby_cells import answer_from_cell
 dotenv.load_dotenv()
 
 # Helper function to read password from secret file or env var
@@ -26,7 +28,9 @@ db_name = os.getenv("DB_NAME", "gas")
 # Build the URL with encoded password
 DATABASE_URL = f"postgresql+asyncpg://{db_user}:{quote_plus(db_password)}@{db_host}:{db_port}/{db_name}"
 
-engine = create_async_engine(DATABASE_URL, pool_size=10, max_overflow=10)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+
+engine = create_async_engine(DATABASE_URL, pool_size=POOL_SIZE, max_overflow=10)
 Session = async_sessionmaker(engine, expire_on_commit=False)
 
 NEARBY_SQL = text("""
@@ -40,7 +44,145 @@ ORDER BY distance_km
 LIMIT :limit
 """)
 
+HEALTH_SQL = text("SELECT 1")
+
+# Optional precomputed per-cell candidates (see app/precompute.py). Off by default;
+# enable once `python -m app.precompute --full` has populated nearby_cell_candidates.
+NEARBY_PRECOMPUTED = os.getenv("NEARBY_PRECOMPUTED", "0") == "1"
+NEARBY_CELL_PRECISION = int(os.getenv("NEARBY_CELL_PRECISION", "5"))  # geohash chars, 5 ~ 5x5 km
+# Below 4 the cells are large enough that the geography polygon's great-circle edges
+# bulge past the ~100 m bounds padding, and the distance bounds stop being conservative.
+if not 4 <= NEARBY_CELL_PRECISION <= 9:
+    raise ValueError(f"NEARBY_CELL_PRECISION must be between 4 and 9, got {NEARBY_CELL_PRECISION}")
+NEARBY_CELL_TOP_N = int(os.getenv("NEARBY_CELL_TOP_N", "200"))
+NEARBY_CELL_MAX_KM = float(os.getenv("NEARBY_CELL_MAX_KM", "25"))
+
+# Exact re-ranking over the cell's candidate list. Returns no rows when the cell
+# isn't precomputed, was computed from a since-replaced gas_stations table, or station
+# changes are waiting for a refresh; one row with a NULL id when the cell is known
+# but nothing is within :km.
+CELL_NEARBY_SQL = text("""
+WITH c AS (
+    SELECT station_ids, covered_km
+    FROM nearby_cell_candidates
+    WHERE resolution = CAST(:precision AS integer)
+      AND cell = ST_GeoHash(ST_SetSRID(ST_MakePoint(:lon, :lat), 4326), CAST(:precision AS integer))
+      AND computed_at IS NOT NULL
+      AND source_oid = 'gas_stations'::regclass::oid
+      AND NOT EXISTS (SELECT 1 FROM gas_stations_changes)
+)
+SELECT c.covered_km, s.*
+FROM c
+LEFT JOIN LATERAL (
+    SELECT id, name, brand, address, lat, lon,
+           service_carwash, service_food, service_coffee, service_shop,
+           opening_hours_display,
+           ST_Distance(geom, ST_MakePoint(:lon, :lat)::geography)/1000 AS distance_km
+    FROM gas_stations
+    WHERE id = ANY(c.station_ids)
+      AND ST_DWithin(geom, ST_MakePoint(:lon, :lat)::geography, :km*1000)
+    ORDER BY distance_km
+    LIMIT :limit
+) s ON true
+""")
+
+async def _nearby_from_cell(s, lat: float, lon: float, km: float, limit: int):
+    """Answer from the precomputed cell, or None if its candidates don't cover the request."""
+    rows = (await s.execute(CELL_NEARBY_SQL, {
+        "lat": lat, "lon": lon, "km": km, "limit": limit, "precision": NEARBY_CELL_PRECISION,
+    })).mappings().all()
+    return answer_from_cell(rows, km, limit)
+
 async def find_nearby(lat: float, lon: float, km: float = 10, limit: int = 50):
     async with Session() as s:
+        # ST_GeoHash rejects out-of-range coordinates; let NEARBY_SQL handle those
+        if NEARBY_PRECOMPUTED and -90 <= lat <= 90 and -180 <= lon <= 180:
+            rows = await _nearby_from_cell(s, lat, lon, km, limit)
+            if rows is not None:
+                return rows
         rows = (await s.execute(NEARBY_SQL, {"lat": lat, "lon": lon, "km": km, "limit": limit})).mappings().all()
         return [dict(r) for r in rows]
+
+# Text search over name/brand, served by the pg_trgm GIN indexes.
+# `<%` is the word-similarity operator, so short queries like "orl" still match
+# "ORLEN Stacja nr 123". Results are grouped into coarse match tiers and then
+# ranked by distance within each tier.
+SEARCH_SQL = text("""
+SELECT id, name, brand, address, lat, lon,
+       service_carwash, service_food, service_coffee, service_shop,
+       opening_hours_display,
+       greatest(word_similarity(:q, coalesce(name, '')),
+                word_similarity(:q, coalesce(brand, ''))) AS match,
+       ST_Distance(geom, ST_MakePoint(:lon, :lat)::geography)/1000 AS distance_km
+FROM gas_stations
+WHERE (:q <% name OR :q <% brand)
+  AND ST_DWithin(geom, ST_MakePoint(:lon, :lat)::geography, :km*1000)
+ORDER BY round(greatest(word_similarity(:q, coalesce(name, '')),
+                        word_similarity(:q, coalesce(brand, '')))::numeric, 1) DESC,
+         distance_km
+LIMIT :limit
+""")
+
+SEARCH_NO_LOCATION_SQL = text("""
+SELECT id, name, brand, address, lat, lon,
+       service_carwash, service_food, service_coffee, service_shop,
+       opening_hours_display,
+       greatest(word_similarity(:q, coalesce(name, '')),
+                word_similarity(:q, coalesce(brand, ''))) AS match
+FROM gas_stations
+WHERE :q <% name OR :q <% brand
+ORDER BY match DESC, name
+LIMIT :limit
+""")
+
+async def search_stations(q: str, lat: float | None = None, lon: float | None = None,
+                          km: float = 50, limit: int = 20):
+    async with Session() as s:
+        if lat is None or lon is None:
+            result = await s.execute(SEARCH_NO_LOCATION_SQL, {"q": q, "limit": limit})
+        else:
+            result = await s.execute(SEARCH_SQL, {"q": q, "lat": lat, "lon": lon, "km": km, "limit": limit})
+        return [dict(r) for r in result.mappings().all()]
+
+# Cheap fingerprint of the gas_stations table contents. The cumulative tuple
+# counters change on every load, so any change here means the data was reloaded.
+DATASET_VERSION_SQL = text("""
+SELECT coalesce(n_tup_ins + n_tup_upd + n_tup_del, 0) || ':' || coalesce(n_live_tup, 0)
+FROM pg_stat_user_tables
+WHERE relname = 'gas_stations'
+""")
+
+# Most common spelling first, so the trie keeps it as the display name for its normalized key
+BRANDS_SQL = text("""
+SELECT brand FROM gas_stations WHERE brand IS NOT NULL AND brand <> ''
+GROUP BY brand
+ORDER BY count(*) DESC, brand
+""")
+
+async def dataset_version() -> str:
+    async with Session() as s:
+        return (await s.execute(DATASET_VERSION_SQL)).scalar() or ""
+
+async def list_brands() -> list[str]:
+    async with Session() as s:
+        return list((await s.execute(BRANDS_SQL)).scalars().all())
+
+# Somewhere inside the dataset (central Warsaw) so warm-up queries plan like real traffic
+WARMUP_POINT = {"lat": 52.2297, "lon": 21.0122}
+
+async def warm_pool(connections: int = POOL_SIZE):
+    """Open `connections` pooled connections and run the hot queries on each.
+
+    asyncpg prepares and caches statements (and PostGIS type codecs) per
+    connection, so every connection has to see the queries once to be warm.
+    """
+    async def warm_one():
+        async with engine.connect() as conn:
+            await conn.execute(HEALTH_SQL)
+            await conn.execute(NEARBY_SQL, {**WARMUP_POINT, "km": 10, "limit": 50})
+            if NEARBY_PRECOMPUTED:
+                await conn.execute(CELL_NEARBY_SQL, {**WARMUP_POINT, "km": 10, "limit": 50,
+                                                     "precision": NEARBY_CELL_PRECISION})
+
+    # Run concurrently so the pool actually grows instead of reusing one connection
+    await asyncio.gather(*(warm_one() for _ in range(connections)))
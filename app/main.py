@@ -1,8 +1,68 @@
 # app/main.py
-from fastapi import FastAPI, Query
+from .startup import report, logger  # first import: starts the startup clock
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+_t = time.perf_counter()
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
-from .db import find_nearby, Session, text
+_t = report.record_import("fastapi", _t)
+from .db import find_nearby, search_stations, warm_pool, engine, Session, HEALTH_SQL, POOL_SIZE
+_t = report.record_import("app.db", _t)
+from .brands import normalize_brand_name, suggest_brands, refresh_brand_trie
+report.record_import("app.brands", _t)
+
+# Warm-up knobs (env): how many pooled connections to pre-open, and whether to preload caches
+# Capped at the pool size: overflow connections are closed on return, so warming them is wasted
+WARMUP_CONNECTIONS = min(int(os.getenv("WARMUP_CONNECTIONS", str(POOL_SIZE))), POOL_SIZE)
+WARMUP_CACHES = os.getenv("WARMUP_CACHES", "1") == "1"
+WARMUP_RETRY_SECONDS = 5
+# Lifespan startup blocks serving, so a stalled DB must not hold it past the healthcheck start period
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "20"))
+
+async def warm_up():
+    with report.timed("first_query"):
+        async with Session() as s:
+            await s.execute(HEALTH_SQL)
+    report.mark_first_query()
+    with report.timed("pool"):
+        await warm_pool(WARMUP_CONNECTIONS)
+    if WARMUP_CACHES:
+        with report.timed("brand_trie"):
+            await refresh_brand_trie(force=True)
+    report.mark_ready()
+
+async def try_warm_up() -> bool:
+    try:
+        await asyncio.wait_for(warm_up(), WARMUP_TIMEOUT)
+        return True
+    except TimeoutError:
+        report.error = f"warm-up timed out after {WARMUP_TIMEOUT:g}s"
+    except Exception as e:
+        report.error = str(e)
+    return False
+
+async def retry_warm_up():
+    # DB wasn't reachable at startup; keep trying in the background so /ready flips once it is
+    while not report.ready:
+        await asyncio.sleep(WARMUP_RETRY_SECONDS)
+        await try_warm_up()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    report.mark_imported()
+    retry_task = None
+    if not await try_warm_up():
+        # Don't block serving (/health must answer); report not-ready instead
+        logger.warning("Warm-up failed, retrying in background: %s", report.error)
+        retry_task = asyncio.create_task(retry_warm_up())
+    yield
+    if retry_task:
+        retry_task.cancel()
+    await engine.dispose()
 
 app = FastAPI(title="Fuel Retail Sites API",
     description="""Simple API to geolocate retail fuel sites.
@@ -12,6 +72,7 @@ app = FastAPI(title="Fuel Retail Sites API",
 - Rate limit: 6/min
 """,
     version="0.1.0",
+    lifespan=lifespan,
     license_info={"name": "Apache 2.0", "url": "https://www.apache.org/licenses/LICENSE-2.0"},
     docs_url="/docs",          # Swagger UI location (default: /docs)
     redoc_url="/redoc",        # ReDoc location (default: /redoc)
@@ -44,20 +105,44 @@ app.add_middleware(
 )
 
 @app.get("/api/nearby")
-async def nearby(lat: float = Query(...), lon: float = Query(...), km: float = 10, limit: int = 50):
+async def nearby(lat: float = Query(..., ge=-90, le=90), lon: float = Query(..., ge=-180, le=180),
+                 km: float = 10, limit: int = 50):
     limit = min(max(limit, 1), 100)  # clamp
     return await find_nearby(lat, lon, km, limit)
 
+@app.get("/api/search")
+async def search(q: str = Query(..., min_length=2), lat: float | None = None, lon: float | None = None,
+                 km: float = 50, limit: int = 20):
+    q = q.strip()  # min_length is checked before stripping, so re-check here
+    if len(q) < 2:
+        raise HTTPException(status_code=422, detail="q must be at least 2 non-blank characters")
+    if (lat is None) != (lon is None):
+        raise HTTPException(status_code=422, detail="lat and lon must be given together")
+    limit = min(max(limit, 1), 100)  # clamp
+    return await search_stations(q, lat, lon, km, limit)
+
+@app.get("/api/brands/suggest")
+async def brands_suggest(prefix: str = Query(..., min_length=1), limit: int = 10):
+    if not normalize_brand_name(prefix):
+        raise HTTPException(status_code=422, detail="prefix must not be blank")
+    limit = min(max(limit, 1), 50)  # clamp
+    return await suggest_brands(prefix, limit)
+
 @app.get("/health")
 async def health():
     # Light DB ping (optional)
     try:
         async with Session() as s:
-            await s.execute(text("SELECT 1"))
+            await s.execute(HEALTH_SQL)
         return {"status": "ok"}
     except Exception as e:
         return {"status": "db_error", "detail": str(e)}
 
+@app.get("/ready")
+async def ready():
+    # 503 until warm-up (pool, prepared queries, caches) has finished; body carries the startup report
+    return JSONResponse(report.as_dict(), status_code=200 if report.ready else 503)
+
 # Mount static files (MUST come after all route definitions)
 # This serves the UI from the /ui directory
 app.mount("/", StaticFiles(directory="ui", html=True), name="ui")
\ No newline at end of file
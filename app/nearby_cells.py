@@ -0,0 +1,58 @@
+# app/nearby_cells.py
+# Dependency-free pieces of the precomputed nearby cells (see app/precompute.py),
+# shared by app.db, app.precompute and the migration that creates the tables.
+
+# Change-tracking triggers on gas_stations. Every change to a station location
+# lands in gas_stations_changes; a NULL geom means "everything changed" (TRUNCATE).
+# Idempotent, so app.precompute can reinstall them after pg_restore --clean drops
+# them together with the table.
+TRACK_CHANGES_DDL = (
+    """
+    CREATE OR REPLACE FUNCTION gas_stations_track_changes() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            INSERT INTO gas_stations_changes (geom) VALUES (NULL);
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            INSERT INTO gas_stations_changes (geom) VALUES (OLD.geom);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO gas_stations_changes (geom) VALUES (NEW.geom);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS gas_stations_track_changes ON gas_stations",
+    "DROP TRIGGER IF EXISTS gas_stations_track_truncate ON gas_stations",
+    """
+    CREATE TRIGGER gas_stations_track_changes
+    AFTER INSERT OR UPDATE OF geom OR DELETE ON gas_stations
+    FOR EACH ROW EXECUTE FUNCTION gas_stations_track_changes()
+    """,
+    """
+    CREATE TRIGGER gas_stations_track_truncate
+    AFTER TRUNCATE ON gas_stations
+    FOR EACH STATEMENT EXECUTE FUNCTION gas_stations_track_changes()
+    """,
+)
+
+def answer_from_cell(rows, km: float, limit: int) -> list[dict] | None:
+    """Stations for a nearby request from CELL_NEARBY_SQL rows, or None to fall back.
+
+    `rows` are the cell's candidates re-ranked by exact distance (at most `limit`),
+    each carrying the cell's covered_km; a single row with a NULL id means the cell
+    exists but no candidate is within `km`. No rows means no usable cell.
+
+    Every station missing from the candidate list is at least covered_km away from
+    any point in the cell, so the answer is exact if the radius stays strictly inside
+    that bound, or if the `limit` nearest candidates were all found strictly inside it.
+    """
+    if not rows:
+        return None
+    covered_km = rows[0]["covered_km"]
+    stations = [{k: v for k, v in r.items() if k != "covered_km"} for r in rows if r["id"] is not None]
+    if km < covered_km or (len(stations) == limit and stations[-1]["distance_km"] < covered_km):
+        return stations
+    return None
@@ -0,0 +1,166 @@
+# app/precompute.py
+# Precomputed nearest-station candidates for hot areas, used by find_nearby when
+# NEARBY_PRECOMPUTED=1. Run after data loads:
+#
+#   python -m app.precompute          # incremental: only cells near changed stations
+#   python -m app.precompute --full   # after a restore or a NEARBY_CELL_* config change
+#
+# Exits with status 2 if an incremental run found the change-tracking triggers missing
+# (gas_stations was replaced without a --full refresh). The run still reinstalls them
+# and recomputes every cell, so the table is correct afterwards.
+import argparse
+import asyncio
+import sys
+from sqlalchemy import text
+from .db import engine, NEARBY_CELL_PRECISION, NEARBY_CELL_TOP_N, NEARBY_CELL_MAX_KM
+from .nearby_cells import TRACK_CHANGES_DDL
+
+# Geohash cells (at :precision) overlapping any hot area. The grid is walked at
+# cell-centre spacing; geohash cell sizes are 360/2^lon_bits x 180/2^lat_bits.
+# Bounds are padded ~100 m so the geography polygon (great-circle edges) safely
+# contains the lat/lon box and distance bounds stay conservative (holds for precision
+# >= 4, which app/db.py enforces).
+SYNC_CELLS_SQL = text("""
+INSERT INTO nearby_cell_candidates (resolution, cell, bounds)
+SELECT CAST(:precision AS integer), cell, ST_Expand(ST_GeomFromGeoHash(cell), 0.001)
+FROM (
+    SELECT DISTINCT ST_GeoHash(ST_SetSRID(ST_MakePoint(x, y), 4326), CAST(:precision AS integer)) AS cell
+    FROM nearby_hot_areas a,
+         LATERAL (SELECT (360 / 2 ^ ceil(5 * CAST(:precision AS integer) / 2.0))::numeric AS w,
+                         (180 / 2 ^ floor(5 * CAST(:precision AS integer) / 2.0))::numeric AS h) d,
+         generate_series(floor(ST_XMin(a.area)::numeric / d.w) * d.w + d.w / 2,
+                         ST_XMax(a.area)::numeric + d.w / 2, d.w) AS x,
+         generate_series(floor(ST_YMin(a.area)::numeric / d.h) * d.h + d.h / 2,
+                         ST_YMax(a.area)::numeric + d.h / 2, d.h) AS y
+    WHERE ST_Intersects(a.area, ST_MakeEnvelope(x - d.w / 2, y - d.h / 2, x + d.w / 2, y + d.h / 2, 4326))
+) cells
+ON CONFLICT (resolution, cell) DO NOTHING
+""")
+
+# Cells from another resolution or no longer under any hot area
+PRUNE_CELLS_SQL = text("""
+DELETE FROM nearby_cell_candidates c
+WHERE c.resolution <> CAST(:precision AS integer)
+   OR NOT EXISTS (SELECT 1 FROM nearby_hot_areas a WHERE ST_Intersects(a.area, c.bounds))
+""")
+
+PENDING_CHANGES_SQL = text("""
+SELECT max(id) AS max_id, bool_or(geom IS NULL) AS truncated FROM gas_stations_changes
+""")
+
+MARK_ALL_DIRTY_SQL = text("""
+UPDATE nearby_cell_candidates SET computed_at = NULL
+""")
+
+# Cells computed from a gas_stations table that has since been dropped and recreated
+MARK_STALE_SOURCE_SQL = text("""
+UPDATE nearby_cell_candidates SET computed_at = NULL
+WHERE source_oid IS DISTINCT FROM 'gas_stations'::regclass::oid
+""")
+
+# A station can only enter or leave a cell's list if it is (or was) within max_km of the cell
+MARK_DIRTY_SQL = text("""
+UPDATE nearby_cell_candidates c SET computed_at = NULL
+FROM (
+    SELECT DISTINCT c2.resolution, c2.cell
+    FROM gas_stations_changes g
+    JOIN nearby_cell_candidates c2
+      ON ST_DWithin(g.geom, c2.bounds::geography, CAST(:max_km AS double precision)*1000)
+    WHERE g.id <= :max_id
+) d
+WHERE c.resolution = d.resolution AND c.cell = d.cell
+""")
+
+# Top-N stations by distance to the cell, plus the radius the list is complete for:
+# max_km if fewer than N stations were in range, otherwise the N-th distance
+# (anything left out is at least that far from every point in the cell).
+COMPUTE_SQL = text("""
+UPDATE nearby_cell_candidates c
+SET station_ids = k.ids, covered_km = k.covered_km, computed_at = now(),
+    source_oid = 'gas_stations'::regclass::oid
+FROM (
+    SELECT c2.cell,
+           coalesce(array_agg(t.id ORDER BY t.d) FILTER (WHERE t.id IS NOT NULL), '{}') AS ids,
+           CASE WHEN count(t.id) < CAST(:top_n AS integer) THEN CAST(:max_km AS double precision)
+                ELSE max(t.d) END AS covered_km
+    FROM nearby_cell_candidates c2
+    LEFT JOIN LATERAL (
+        SELECT s.id::bigint AS id, ST_Distance(s.geom, c2.bounds::geography)/1000 AS d
+        FROM gas_stations s
+        WHERE ST_DWithin(s.geom, c2.bounds::geography, CAST(:max_km AS double precision)*1000)
+        ORDER BY d
+        LIMIT CAST(:top_n AS integer)
+    ) t ON true
+    WHERE c2.resolution = CAST(:precision AS integer) AND c2.computed_at IS NULL
+    GROUP BY c2.cell
+) k
+WHERE c.resolution = CAST(:precision AS integer) AND c.cell = k.cell
+""")
+
+CLEAR_CHANGES_SQL = text("""
+DELETE FROM gas_stations_changes WHERE id <= :max_id
+""")
+
+TRIGGERS_SQL = text("""
+SELECT count(*) FROM pg_trigger
+WHERE tgrelid = 'gas_stations'::regclass AND tgname LIKE 'gas_stations_track_%'
+""")
+
+INSTALL_TRIGGERS_SQL = [text(sql) for sql in TRACK_CHANGES_DDL]
+
+async def refresh(full: bool = False) -> dict:
+    """Bring nearby_cell_candidates up to date in one transaction.
+
+    Readers keep using the previous lists until commit, and find_nearby ignores
+    cells while gas_stations_changes is non-empty or when they were computed from
+    a different gas_stations table, so results stay exact.
+    """
+    params = {"precision": NEARBY_CELL_PRECISION, "top_n": NEARBY_CELL_TOP_N, "max_km": NEARBY_CELL_MAX_KM}
+    async with engine.connect() as conn:
+        # REPEATABLE READ: every statement sees one snapshot, so the change rows marked
+        # dirty and the ones deleted at the end are exactly the same set. Rows committed
+        # by a concurrent load after the snapshot stay for the next refresh.
+        conn = await conn.execution_options(isolation_level="REPEATABLE READ")
+        async with conn.begin():
+            # Missing triggers mean gas_stations was replaced and changes went unrecorded
+            triggers_missing = (await conn.execute(TRIGGERS_SQL)).scalar() < 2
+            if triggers_missing:
+                for stmt in INSTALL_TRIGGERS_SQL:
+                    await conn.execute(stmt)
+            pending = (await conn.execute(PENDING_CHANGES_SQL)).mappings().one()
+            max_id = pending["max_id"] or 0
+            await conn.execute(PRUNE_CELLS_SQL, params)
+            added = (await conn.execute(SYNC_CELLS_SQL, params)).rowcount
+            if full or triggers_missing or pending["truncated"]:
+                await conn.execute(MARK_ALL_DIRTY_SQL)
+            else:
+                await conn.execute(MARK_STALE_SOURCE_SQL)
+                if max_id:
+                    await conn.execute(MARK_DIRTY_SQL, {**params, "max_id": max_id})
+            computed = (await conn.execute(COMPUTE_SQL, params)).rowcount
+            await conn.execute(CLEAR_CHANGES_SQL, {"max_id": max_id})
+    return {"cells_added": added, "cells_computed": computed, "last_change_id": max_id,
+            "triggers_reinstalled": triggers_missing}
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh precomputed nearby-station cells")
+    parser.add_argument("--full", action="store_true", help="recompute every cell, not just those near changes")
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            return await refresh(full=args.full)
+        finally:
+            await engine.dispose()
+
+    result = asyncio.run(run())
+    print(result)
+    if result["triggers_reinstalled"]:
+        print("WARNING: change-tracking triggers were missing on gas_stations (table replaced, "
+              "e.g. by pg_restore --clean); reinstalled them and recomputed all cells.")
+        if not args.full:
+            # Expected after a restore with --full; on an incremental run it means a load skipped the refresh
+            sys.exit(2)
+
+if __name__ == "__main__":
+    main()
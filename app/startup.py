@@ -0,0 +1,66 @@
+# app/startup.py
+# Cold-start bookkeeping: imported first by app.main so the clock starts as early as possible.
+# For a finer breakdown than the per-group import times use: python -X importtime -c "import app.main"
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("uvicorn.error")
+
+_t0 = time.perf_counter()
+
+class StartupReport:
+    """Timings collected while the app imports and warms up (all in milliseconds)."""
+
+    def __init__(self):
+        self.imports: dict[str, float] = {}  # per import group in app.main
+        self.import_ms: float | None = None  # startup clock -> lifespan start (imports + app setup)
+        self.steps: dict[str, float] = {}
+        self.first_query_ms: float | None = None
+        self.ready_ms: float | None = None
+        self.ready = False
+        self.error: str | None = None
+
+    @contextmanager
+    def timed(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    def record_import(self, name: str, start: float) -> float:
+        """Record the time since `start` (a perf_counter value) for an import group; returns now."""
+        now = time.perf_counter()
+        self.imports[name] = round((now - start) * 1000, 1)
+        return now
+
+    def mark_imported(self):
+        if self.import_ms is None:
+            self.import_ms = since_start_ms()
+
+    def mark_first_query(self):
+        if self.first_query_ms is None:
+            self.first_query_ms = since_start_ms()
+
+    def mark_ready(self):
+        self.ready = True
+        self.error = None
+        self.ready_ms = since_start_ms()
+        logger.info("Startup report: %s", self.as_dict())
+
+    def as_dict(self) -> dict:
+        return {
+            "ready": self.ready,
+            "imports_ms": self.imports,
+            "import_ms": self.import_ms,
+            "steps_ms": self.steps,
+            "first_query_ms": self.first_query_ms,
+            "ready_ms": self.ready_ms,
+            "error": self.error,
+        }
+
+def since_start_ms() -> float:
+    return round((time.perf_counter() - _t0) * 1000, 1)
+
+report = StartupReport()
@@ -0,0 +1,40 @@
+# Exactness rule for answering /api/nearby from a precomputed cell
+from app.nearby_cells import answer_from_cell
+
+def station(id, distance_km, covered_km=5.0):
+    return {"covered_km": covered_km, "id": id, "name": f"station {id}", "distance_km": distance_km}
+
+def test_no_cell_falls_back():
+    assert answer_from_cell([], km=1, limit=10) is None
+
+def test_serves_when_radius_inside_bound():
+    rows = [station(1, 0.5), station(2, 3.0)]
+    assert answer_from_cell(rows, km=4, limit=10) == [
+        {"id": 1, "name": "station 1", "distance_km": 0.5},
+        {"id": 2, "name": "station 2", "distance_km": 3.0},
+    ]
+
+def test_serves_when_limit_results_inside_bound():
+    # Radius exceeds the bound, but the `limit` nearest are all strictly inside it
+    rows = [station(1, 0.5), station(2, 4.9)]
+    assert [s["id"] for s in answer_from_cell(rows, km=50, limit=2)] == [1, 2]
+
+def test_radius_equal_to_bound_falls_back():
+    # A station left out of the list may sit exactly at covered_km
+    assert answer_from_cell([station(1, 0.5)], km=5.0, limit=10) is None
+
+def test_last_result_on_bound_falls_back():
+    rows = [station(1, 0.5), station(2, 5.0)]
+    assert answer_from_cell(rows, km=50, limit=2) is None
+
+def test_fewer_than_limit_beyond_bound_falls_back():
+    rows = [station(1, 0.5), station(2, 1.0)]
+    assert answer_from_cell(rows, km=50, limit=3) is None
+
+def test_empty_cell_inside_bound_is_exact():
+    rows = [{"covered_km": 5.0, "id": None, "name": None, "distance_km": None}]
+    assert answer_from_cell(rows, km=2, limit=10) == []
+
+def test_null_station_row_does_not_count_towards_limit():
+    rows = [{"covered_km": 5.0, "id": None, "name": None, "distance_km": None}]
+    assert answer_from_cell(rows, km=10, limit=1) is None
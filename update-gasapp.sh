@@ -38,6 +38,34 @@ else
 fi
 echo ""
 
+echo "7a. Refreshing precomputed nearby cells..."
+if docker exec $(docker ps -q -f name=gasapp_app) python -m app.precompute; then
+    echo "✓ Nearby cells up to date"
+else
+    echo "⚠ Warning: Nearby cell refresh reported a problem (see output above)"
+fi
+echo ""
+
+echo "7b. Waiting for app warm-up (/ready)..."
+READY=0
+for i in $(seq 1 30); do
+    # Port 8000 is only exposed on the overlay network, so probe from inside the container
+    if docker exec $(docker ps -q -f name=gasapp_app) python -c "import urllib.request; urllib.request.urlopen('http://localhost:8000/ready')" > /dev/null 2>&1; then
+        READY=1
+        break
+    fi
+    sleep 2
+done
+if [ "$READY" -eq 1 ]; then
+    echo "✓ App reports ready (pool and caches warmed)"
+else
+    echo "⚠ Warning: App did not report ready within 60s. Check /ready output:"
+    docker exec $(docker ps -q -f name=gasapp_app) python -c "import urllib.request, urllib.error
+try: print(urllib.request.urlopen('http://localhost:8000/ready').read().decode())
+except urllib.error.HTTPError as e: print(e.read().decode())" || true
+fi
+echo ""
+
 echo "8. Verifying migration version..."
 docker exec $(docker ps -q -f name=gasapp_db) \
   psql -U gasapp -d gas -t -c "SELECT version_num FROM alembic_version" 2>/dev/null || echo "Alembic not initialized"